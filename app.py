@@ -1,11 +1,21 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Flask, Response, g, render_template, request, redirect, session, url_for, flash
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from urllib.parse import urlparse
+from flask_caching import Cache
+from sqlalchemy import event, func, inspect
+import sqlalchemy.dialects.postgresql  # noqa: F401 - registers to_tsvector()/to_tsquery() for food_name_search
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import joinedload, contains_eager, load_only, selectinload
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import os
+import orjson
+import sqlite3
+from werkzeug.security import check_password_hash, generate_password_hash
 from datetime import datetime, timedelta
 
-from models import db, User, Food, Meal, Symptom, FoodCategory, SymptomType
+from models import db, User, Food, Meal, Symptom, FoodCategory, SymptomType, password_hash_method
 from forms import RegistrationForm, LoginForm, FoodForm, MealLogForm, SymptomForm, SearchForm
+from config import Config, config
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -13,35 +23,188 @@ app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-i
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///tummy_tracker.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# FLASK_CONFIG (development, testing or production) applies that whole config
+# class; without it only the base Config's app settings are taken, so password
+# hashes stay at full cost unless a cheap environment is asked for explicitly
+config_name = os.environ.get('FLASK_CONFIG')
+if config_name:
+    app.config.from_object(config[config_name])
+    if 'DATABASE_URL' in os.environ:
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ['DATABASE_URL']
+else:
+    app.config['PASSWORD_HASH_METHOD'] = Config.PASSWORD_HASH_METHOD
+    app.config['MEALS_PER_PAGE'] = Config.MEALS_PER_PAGE
+    app.config['SYMPTOMS_PER_PAGE'] = Config.SYMPTOMS_PER_PAGE
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = Config.SQLALCHEMY_ENGINE_OPTIONS
+
+# In-memory SQLite runs on a single static connection that takes no pool options
+db_url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+if db_url.get_backend_name() == 'sqlite' and db_url.database in (None, '', ':memory:'):
+    app.config.pop('SQLALCHEMY_ENGINE_OPTIONS', None)
+
 # Initialize extensions
 db.init_app(app)
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Use WAL journaling and a larger page cache for SQLite connections."""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA mmap_size=268435456')
+    cursor.execute('PRAGMA cache_size=-65536')
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
+cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache'})
+
+# Load only the columns the meal list templates render (skips Food.ingredients etc.)
+MEAL_COLUMNS = load_only(Meal.meal_time, Meal.quantity, Meal.notes)
+MEAL_FOOD_COLUMNS = (Food.name, Food.category, Food.allergens)
+
+# Worker threads for running independent dashboard queries side by side
+dashboard_executor = ThreadPoolExecutor(max_workers=4)
 
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
 
+def user_meals():
+    """Return the current user's meal query, built once per request."""
+    query = getattr(g, '_user_meals', None)
+    if query is None:
+        g._user_meals = query = Meal.query.filter_by(user_id=current_user.id)
+    return query
+
+def user_symptoms():
+    """Return the current user's symptom query, built once per request."""
+    query = getattr(g, '_user_symptoms', None)
+    if query is None:
+        g._user_symptoms = query = Symptom.query.filter_by(user_id=current_user.id)
+    return query
+
+@cache.memoize(timeout=60)
+def user_totals(user_id):
+    """Return (total_meals, total_symptoms) for a user in a single query."""
+    meal_count = db.select(func.count(Meal.id)).where(Meal.user_id == user_id).scalar_subquery()
+    symptom_count = db.select(func.count(Symptom.id)).where(Symptom.user_id == user_id).scalar_subquery()
+    return tuple(db.session.execute(db.select(meal_count, symptom_count)).one())
+
+@cache.cached(timeout=300, key_prefix='food_choices')
+def get_food_choices():
+    """Return the (id, name) choices for the meal form's food select."""
+    return [(f.id, f.name) for f in Food.query.with_entities(Food.id, Food.name).order_by(Food.name).all()]
+
+@cache.cached(timeout=300, key_prefix='foods_json')
+def get_foods_json():
+    """Return the serialized food list served by /api/foods."""
+    foods = Food.query.with_entities(Food.id, Food.name, Food.category).order_by(Food.name).all()
+    return orjson.dumps([{'id': f.id, 'name': f.name, 'category': f.category} for f in foods])
+
+@cache.cached(timeout=300, key_prefix='food_fts_enabled')
+def food_fts_enabled():
+    """Return True if the SQLite food_fts full-text index exists."""
+    return db.engine.dialect.name == 'sqlite' and inspect(db.engine).has_table('food_fts')
+
+def fts5_prefix_query(term):
+    """Build an FTS5 MATCH query requiring a word starting with each search word."""
+    # Quote each word so user input can't inject FTS5 syntax
+    return ' '.join('"%s"*' % word.replace('"', '""') for word in term.split())
+
+def tsquery_prefix_query(term):
+    """Build a PostgreSQL tsquery requiring a word starting with each search word."""
+    # Quote each word as a lexeme so user input can't inject tsquery syntax
+    return ' & '.join("'%s':*" % word.replace('\\', '\\\\').replace("'", "''") for word in term.split())
+
+def food_name_search(term):
+    """Return a filter matching foods whose name has words starting with the search words."""
+    if db.engine.dialect.name == 'postgresql':
+        query = tsquery_prefix_query(term)
+        return func.to_tsvector('simple', Food.name).op('@@')(func.to_tsquery('simple', query))
+    if food_fts_enabled():
+        query = fts5_prefix_query(term)
+        matches = db.text('SELECT rowid FROM food_fts WHERE food_fts MATCH :query').bindparams(
+            query=query
+        ).columns(db.column('rowid', db.Integer))
+        return Food.id.in_(matches)
+    return Food.name.ilike(f'%{term}%')
+
+def recent_meals_for(user_id):
+    """Return a user's five most recent meals with their foods loaded."""
+    return Meal.query.options(
+        MEAL_COLUMNS, joinedload(Meal.food).load_only(*MEAL_FOOD_COLUMNS)
+    ).filter_by(user_id=user_id).order_by(Meal.meal_time.desc()).limit(5).all()
+
+def recent_symptoms_for(user_id):
+    """Return a user's five most recent symptoms."""
+    return Symptom.query.filter_by(user_id=user_id).order_by(Symptom.onset_time.desc()).limit(5).all()
+
+def run_in_app_context(func, *args):
+    """Call func in a fresh app context, which gives it its own database session."""
+    with app.app_context():
+        return func(*args)
+
+def dummy_password_hash():
+    """Return a throwaway hash made with the configured method, created on first use."""
+    dummy = getattr(app, '_dummy_password_hash', None)
+    if dummy is None:
+        dummy = app._dummy_password_hash = generate_password_hash(os.urandom(16).hex(), method=password_hash_method())
+    return dummy
+
+def safe_next_url(next_page):
+    """Return next_page if it is a same-site path, otherwise the index URL."""
+    # Browsers read a leading // or /\ as another host
+    if not next_page or not next_page.startswith('/') or next_page.startswith(('//', '/\\')) \
+            or not next_page.isprintable():
+        return url_for('index')
+    return next_page
+
+def parse_datetime(value):
+    """Parse an ISO date or datetime string, returning None if it is empty or invalid."""
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
 # Routes
 @app.route('/')
 def index():
     """Home page with overview and quick actions."""
     if current_user.is_authenticated:
-        # Get recent meals and symptoms for dashboard
-        recent_meals = Meal.query.filter_by(user_id=current_user.id).order_by(Meal.meal_time.desc()).limit(5).all()
-        recent_symptoms = Symptom.query.filter_by(user_id=current_user.id).order_by(Symptom.onset_time.desc()).limit(5).all()
-        
-        # Get basic stats
-        total_meals = Meal.query.filter_by(user_id=current_user.id).count()
-        total_symptoms = Symptom.query.filter_by(user_id=current_user.id).count()
+        # Get recent meals, symptoms and basic stats for dashboard. SQLite gains
+        # nothing from extra connections, so only overlap the queries elsewhere.
+        if db.engine.dialect.name == 'sqlite':
+            recent_meals = recent_meals_for(current_user.id)
+            recent_symptoms = recent_symptoms_for(current_user.id)
+            total_meals, total_symptoms = user_totals(current_user.id)
+        else:
+            futures = [
+                dashboard_executor.submit(run_in_app_context, func, current_user.id)
+                for func in (recent_meals_for, recent_symptoms_for, user_totals)
+            ]
+            recent_meals, recent_symptoms, (total_meals, total_symptoms) = [f.result() for f in futures]
         
         return render_template('dashboard.html', 
                              recent_meals=recent_meals, 
                              recent_symptoms=recent_symptoms,
                              total_meals=total_meals,
                              total_symptoms=total_symptoms)
-    return render_template('index.html')
+    
+    # Pending flash messages need a fresh render; otherwise serve the prerendered page
+    if '_flashes' in session:
+        return render_template('index.html')
+    response = Response(INDEX_HTML, mimetype='text/html')
+    response.set_etag(INDEX_ETAG)
+    # Revalidate every time: the same URL serves the dashboard once logged in
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Cookie')
+    return response.make_conditional(request)
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -80,12 +243,15 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(username=form.username.data).first()
-        if user and user.check_password(form.password.data):
+        if user:
+            password_ok = user.check_password(form.password.data)
+        else:
+            # Verify against a dummy hash so unknown usernames take as long as wrong passwords
+            check_password_hash(dummy_password_hash(), form.password.data)
+            password_ok = False
+        if password_ok:
             login_user(user)
-            next_page = request.args.get('next')
-            if not next_page or urlparse(next_page).netloc != '':
-                next_page = url_for('index')
-            return redirect(next_page)
+            return redirect(safe_next_url(request.args.get('next')))
         else:
             flash('Invalid username or password.', 'error')
     
@@ -112,6 +278,8 @@ def foods():
         )
         db.session.add(food)
         db.session.commit()
+        cache.delete('food_choices')
+        cache.delete('foods_json')
         flash('Food added successfully!', 'success')
         return redirect(url_for('foods'))
     
@@ -126,7 +294,7 @@ def meals():
     form = MealLogForm()
     
     # Populate food choices
-    form.food_id.choices = [(f.id, f.name) for f in Food.query.order_by(Food.name).all()]
+    form.food_id.choices = get_food_choices()
     
     if form.validate_on_submit():
         meal = Meal(
@@ -138,12 +306,19 @@ def meals():
         )
         db.session.add(meal)
         db.session.commit()
+        cache.delete_memoized(user_totals, current_user.id)
         flash('Meal logged successfully!', 'success')
         return redirect(url_for('meals'))
     
-    # Get user's meals
-    meals_list = Meal.query.filter_by(user_id=current_user.id).order_by(Meal.meal_time.desc()).all()
-    return render_template('meals.html', form=form, meals=meals_list)
+    # Get user's meals, one page at a time
+    pagination = user_meals().options(
+        MEAL_COLUMNS, joinedload(Meal.food).load_only(*MEAL_FOOD_COLUMNS)
+    ).order_by(Meal.meal_time.desc()).paginate(
+        page=request.args.get('page', 1, type=int),
+        per_page=app.config['MEALS_PER_PAGE'],
+        error_out=False
+    )
+    return render_template('meals.html', form=form, meals=pagination.items, pagination=pagination)
 
 @app.route('/symptoms', methods=['GET', 'POST'])
 @login_required
@@ -153,8 +328,9 @@ def symptoms():
     
     # Populate meal choices (only meals from the last 24 hours)
     yesterday = datetime.utcnow() - timedelta(days=1)
-    recent_meals = Meal.query.filter(
-        Meal.user_id == current_user.id,
+    recent_meals = user_meals().options(
+        load_only(Meal.meal_time), joinedload(Meal.food).load_only(Food.name)
+    ).filter(
         Meal.meal_time >= yesterday
     ).order_by(Meal.meal_time.desc()).all()
     form.meal_id.choices = [(m.id, f"{m.food.name} at {m.meal_time.strftime('%Y-%m-%d %H:%M')}") for m in recent_meals]
@@ -171,12 +347,19 @@ def symptoms():
         )
         db.session.add(symptom)
         db.session.commit()
+        cache.delete_memoized(user_totals, current_user.id)
         flash('Symptom logged successfully!', 'success')
         return redirect(url_for('symptoms'))
     
-    # Get user's symptoms
-    symptoms_list = Symptom.query.filter_by(user_id=current_user.id).order_by(Symptom.onset_time.desc()).all()
-    return render_template('symptoms.html', form=form, symptoms=symptoms_list)
+    # Get user's symptoms, one page at a time
+    pagination = user_symptoms().options(
+        joinedload(Symptom.meal).load_only(Meal.meal_time).joinedload(Meal.food).load_only(Food.name)
+    ).order_by(Symptom.onset_time.desc()).paginate(
+        page=request.args.get('page', 1, type=int),
+        per_page=app.config['SYMPTOMS_PER_PAGE'],
+        error_out=False
+    )
+    return render_template('symptoms.html', form=form, symptoms=pagination.items, pagination=pagination)
 
 @app.route('/history')
 @login_required
@@ -185,33 +368,43 @@ def history():
     form = SearchForm()
     
     # Get search parameters
-    search_term = request.args.get('search_term', '')
-    date_from = request.args.get('date_from', '')
-    date_to = request.args.get('date_to', '')
+    search_term = request.args.get('search_term', '').strip()
+    date_from = parse_datetime(request.args.get('date_from', ''))
+    date_to = parse_datetime(request.args.get('date_to', ''))
     category = request.args.get('category', '')
     
-    # Build query for meals
-    meals_query = Meal.query.filter_by(user_id=current_user.id)
+    # Collect the active filters and apply them in one pass
+    conditions = []
     if search_term:
-        meals_query = meals_query.join(Food).filter(Food.name.ilike(f'%{search_term}%'))
+        conditions.append(food_name_search(search_term))
     if category:
-        meals_query = meals_query.join(Food).filter(Food.category == category)
+        conditions.append(Food.category == category)
     if date_from:
-        meals_query = meals_query.filter(Meal.meal_time >= datetime.fromisoformat(date_from))
+        conditions.append(Meal.meal_time >= date_from)
     if date_to:
-        meals_query = meals_query.filter(Meal.meal_time <= datetime.fromisoformat(date_to))
+        conditions.append(Meal.meal_time <= date_to)
     
-    meals_list = meals_query.order_by(Meal.meal_time.desc()).all()
+    # Build query for meals; the Food join also populates meal.food for the template
+    meals_query = user_meals().join(Food).options(
+        MEAL_COLUMNS,
+        contains_eager(Meal.food).load_only(*MEAL_FOOD_COLUMNS),
+        selectinload(Meal.symptoms)
+    ).filter(*conditions)
     
-    return render_template('history.html', form=form, meals=meals_list)
+    pagination = meals_query.order_by(Meal.meal_time.desc()).paginate(
+        page=request.args.get('page', 1, type=int),
+        per_page=app.config['MEALS_PER_PAGE'],
+        error_out=False
+    )
+    
+    return render_template('history.html', form=form, meals=pagination.items, pagination=pagination)
 
 @app.route('/analytics')
 @login_required
 def analytics():
     """Analytics and pattern analysis page."""
     # Get basic statistics
-    total_meals = Meal.query.filter_by(user_id=current_user.id).count()
-    total_symptoms = Symptom.query.filter_by(user_id=current_user.id).count()
+    total_meals, total_symptoms = user_totals(current_user.id)
     
     if total_meals == 0:
         return render_template('analytics.html', 
@@ -219,13 +412,22 @@ def analytics():
                              total_symptoms=total_symptoms,
                              show_analytics=False)
     
-    # Get food category breakdown
-    from sqlalchemy import func
+    # Get food category breakdown. Symptoms are averaged per meal first so a
+    # meal with several symptoms is still counted once.
+    symptom_per_meal = db.session.query(
+        Symptom.meal_id,
+        func.avg(Symptom.severity).label('avg_severity')
+    ).filter(
+        Symptom.user_id == current_user.id
+    ).group_by(Symptom.meal_id).subquery()
+    
     category_stats = db.session.query(
         Food.category,
         func.count(Meal.id).label('meal_count'),
-        func.avg(Symptom.severity).label('avg_severity')
-    ).join(Meal).outerjoin(Symptom).filter(
+        func.avg(symptom_per_meal.c.avg_severity).label('avg_severity')
+    ).select_from(Meal).join(Food).outerjoin(
+        symptom_per_meal, symptom_per_meal.c.meal_id == Meal.id
+    ).filter(
         Meal.user_id == current_user.id
     ).group_by(Food.category).all()
     
@@ -249,23 +451,36 @@ def analytics():
 @login_required
 def api_foods():
     """API endpoint for getting foods (for AJAX requests)."""
-    foods = Food.query.order_by(Food.name).all()
-    return jsonify([{'id': f.id, 'name': f.name, 'category': f.category} for f in foods])
+    return Response(get_foods_json(), mimetype='application/json')
 
 @app.route('/api/meals')
 @login_required
 def api_meals():
-    """API endpoint for getting user's meals."""
-    meals = Meal.query.filter_by(user_id=current_user.id).order_by(Meal.meal_time.desc()).all()
-    return jsonify([{
-        'id': m.id,
-        'food_name': m.food.name,
-        'meal_time': m.meal_time.isoformat(),
-        'quantity': m.quantity,
-        'notes': m.notes
-    } for m in meals])
+    """API endpoint for getting user's meals, paginated."""
+    # Select plain rows rather than ORM objects; only these columns are returned
+    pagination = user_meals().join(Food).with_entities(
+        Meal.id, Food.name.label('food_name'), Meal.meal_time, Meal.quantity, Meal.notes
+    ).order_by(Meal.meal_time.desc()).paginate(
+        page=request.args.get('page', 1, type=int),
+        per_page=app.config['MEALS_PER_PAGE'],
+        error_out=False
+    )
+    # orjson serializes meal_time natively, in the same ISO format as isoformat()
+    return Response(orjson.dumps({
+        'items': [row._asdict() for row in pagination.items],
+        'page': pagination.page,
+        'pages': pagination.pages
+    }), mimetype='application/json')
+
+def render_landing_page():
+    """Render the anonymous landing page, which is the same for every visitor."""
+    with app.test_request_context('/'):
+        html = render_template('index.html').encode()
+    return html, hashlib.md5(html).hexdigest()
+
+INDEX_HTML, INDEX_ETAG = render_landing_page()
 
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
-    app.run(debug=True)
+    app.run(debug=app.config['DEBUG'] if config_name else True)
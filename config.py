@@ -15,6 +15,11 @@ class Config:
     # Database Configuration
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///tummy_tracker.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 10,
+        'pool_pre_ping': True,
+        'pool_recycle': 300
+    }
     
     # Session Configuration
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
@@ -22,6 +27,9 @@ class Config:
     SESSION_COOKIE_HTTPONLY = os.environ.get('SESSION_COOKIE_HTTPONLY', 'True').lower() == 'true'
     SESSION_COOKIE_SAMESITE = os.environ.get('SESSION_COOKIE_SAMESITE', 'Lax')
     
+    # Password Hashing (werkzeug method string, e.g. 'pbkdf2:sha256:600000' or 'scrypt')
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2')
+    
     # Machine Learning Configuration
     ML_MODEL_PATH = os.environ.get('ML_MODEL_PATH', 'data/models/')
     MIN_MEALS_FOR_ML = int(os.environ.get('MIN_MEALS_FOR_ML', '10'))
@@ -46,6 +54,7 @@ class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///tummy_tracker_dev.db'
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:10000')  # cheap hashes for local use only
 
 class ProductionConfig(Config):
     """Production configuration."""
@@ -59,6 +68,7 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///tummy_tracker_test.db'
     WTF_CSRF_ENABLED = False
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:10000')  # keeps test logins fast
 
 # Configuration dictionary
 config = {
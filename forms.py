@@ -3,6 +3,22 @@ from wtforms import StringField, PasswordField, SubmitField, TextAreaField, Sele
 from wtforms.validators import DataRequired, Email, Length, EqualTo, NumberRange, Optional
 from datetime import datetime
 
+# Food categories shared by the food and search forms
+FOOD_CATEGORIES = (
+    ('dairy', 'Dairy'),
+    ('gluten', 'Gluten'),
+    ('spicy', 'Spicy'),
+    ('processed', 'Processed'),
+    ('raw', 'Raw'),
+    ('fermented', 'Fermented'),
+    ('high_fiber', 'High Fiber'),
+    ('high_fat', 'High Fat'),
+    ('sugary', 'Sugary'),
+    ('acidic', 'Acidic'),
+    ('other', 'Other')
+)
+
+
 class RegistrationForm(FlaskForm):
     """Form for user registration."""
     username = StringField('Username', validators=[DataRequired(), Length(min=3, max=80)])
@@ -22,20 +38,7 @@ class LoginForm(FlaskForm):
 class FoodForm(FlaskForm):
     """Form for adding new foods."""
     name = StringField('Food Name', validators=[DataRequired(), Length(max=200)])
-    category = SelectField('Category', choices=[
-        ('', 'Select Category'),
-        ('dairy', 'Dairy'),
-        ('gluten', 'Gluten'),
-        ('spicy', 'Spicy'),
-        ('processed', 'Processed'),
-        ('raw', 'Raw'),
-        ('fermented', 'Fermented'),
-        ('high_fiber', 'High Fiber'),
-        ('high_fat', 'High Fat'),
-        ('sugary', 'Sugary'),
-        ('acidic', 'Acidic'),
-        ('other', 'Other')
-    ], validators=[DataRequired()])
+    category = SelectField('Category', choices=(('', 'Select Category'),) + FOOD_CATEGORIES, validators=[DataRequired()])
     ingredients = TextAreaField('Ingredients (optional)', validators=[Optional()])
     allergens = TextAreaField('Allergens (optional)', validators=[Optional()])
     submit = SubmitField('Add Food')
@@ -84,18 +87,5 @@ class SearchForm(FlaskForm):
     search_term = StringField('Search', validators=[Optional()])
     date_from = DateTimeField('From Date', validators=[Optional()])
     date_to = DateTimeField('To Date', validators=[Optional()])
-    category = SelectField('Food Category', choices=[
-        ('', 'All Categories'),
-        ('dairy', 'Dairy'),
-        ('gluten', 'Gluten'),
-        ('spicy', 'Spicy'),
-        ('processed', 'Processed'),
-        ('raw', 'Raw'),
-        ('fermented', 'Fermented'),
-        ('high_fiber', 'High Fiber'),
-        ('high_fat', 'High Fat'),
-        ('sugary', 'Sugary'),
-        ('acidic', 'Acidic'),
-        ('other', 'Other')
-    ], validators=[Optional()])
+    category = SelectField('Food Category', choices=(('', 'All Categories'),) + FOOD_CATEGORIES, validators=[Optional()])
     submit = SubmitField('Search')
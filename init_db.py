@@ -5,7 +5,8 @@ This script creates the database tables and populates them with sample data.
 """
 
 from app import app, db
-from models import User, Food, FoodCategory, SymptomType
+from models import User, Food, FoodCategory, SymptomType, FOOD_FTS_DDL
+from sqlalchemy import insert, text
 from werkzeug.security import generate_password_hash
 from datetime import datetime
 
@@ -17,6 +18,22 @@ def init_database():
         db.create_all()
         print("✓ Database tables created successfully!")
         
+        # create_all() skips tables that already exist, so add any indexes
+        # missing from databases created before they were defined
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=db.engine, checkfirst=True)
+        print("✓ Database indexes up to date!")
+        
+        # Same for the SQLite food name search index; rebuild it so foods added
+        # before it existed are searchable
+        if db.engine.dialect.name == 'sqlite':
+            for statement in FOOD_FTS_DDL:
+                db.session.execute(text(statement))
+            db.session.execute(text("INSERT INTO food_fts(food_fts) VALUES ('rebuild')"))
+            db.session.commit()
+            print("✓ Food search index up to date!")
+        
         # Check if sample data already exists
         if User.query.first():
             print("Sample data already exists. Skipping data population.")
@@ -39,9 +56,7 @@ def init_database():
             {'name': 'other', 'description': 'Other food categories', 'risk_level': 1}
         ]
         
-        for cat_data in categories:
-            category = FoodCategory(**cat_data)
-            db.session.add(category)
+        db.session.execute(insert(FoodCategory), categories)
         
         # Create sample symptom types
         symptom_types = [
@@ -57,9 +72,7 @@ def init_database():
             {'name': 'other', 'description': 'Other digestive symptoms', 'severity_scale': '1-5 scale'}
         ]
         
-        for symp_data in symptom_types:
-            symptom_type = SymptomType(**symp_data)
-            db.session.add(symptom_type)
+        db.session.execute(insert(SymptomType), symptom_types)
         
         # Create sample foods
         sample_foods = [
@@ -113,9 +126,7 @@ def init_database():
             }
         ]
         
-        for food_data in sample_foods:
-            food = Food(**food_data)
-            db.session.add(food)
+        db.session.execute(insert(Food), sample_foods)
         
         # Commit all changes
         db.session.commit()
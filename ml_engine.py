@@ -3,122 +3,331 @@ Machine Learning Engine for Tummy Tracker
 This module provides ML functionality for analyzing food-symptom patterns.
 """
 
+import os
 import pandas as pd
 import numpy as np
+
+# Optional Intel oneDAL acceleration; patching must happen before the
+# scikit-learn estimators below are imported
+if os.environ.get('TT_USE_SKLEARNEX', 'True').lower() == 'true':
+    try:
+        from sklearnex import patch_sklearn
+        patch_sklearn()
+    except ImportError:
+        pass
+
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import accuracy_score, classification_report
+from scipy.special import expit
+import functools
+import hashlib
+import importlib.machinery
+import importlib.util
 import joblib
-import os
-from datetime import datetime, timedelta
+from joblib import Parallel, delayed
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+
+try:
+    import sklearn_freezer  # optional: compiles the Random Forest to C extensions
+except ImportError:
+    sklearn_freezer = None
+
+try:
+    from numba import njit, prange  # optional: JIT-compiled substring scans
+except ImportError:
+    njit = None
+
+# Ingredient substrings that flag common trigger foods
+DAIRY_INGREDIENTS = 'milk|cheese|yogurt|butter|cream'
+GLUTEN_INGREDIENTS = 'wheat|flour|bread|pasta'
+SPICY_INGREDIENTS = 'pepper|chili|hot|spicy'
+
+# Allergens counted by the allergen_count feature
+TRACKED_ALLERGENS = ['dairy', 'nuts', 'gluten', 'soy', 'fish']
+
+# A small, depth-limited forest: meal histories are short, and fewer, shallower
+# trees keep training, inference and the saved bundle cheap
+RF_PARAMS = {
+    'n_estimators': 32,
+    'max_depth': 8,
+    'min_samples_leaf': 3,
+    'n_jobs': -1,
+    'random_state': 42
+}
+
+# Number of distinct (quantized) feature rows whose predictions are kept
+PREDICTION_CACHE_SIZE = 4096
+
+# Saved models: one joblib bundle, LZ4-compressed when the lz4 package is installed
+MODEL_BUNDLE = 'bundle.joblib'
+
+# Compiled Random Forest extensions are saved next to the bundle under this prefix
+FOREST_MODULE_PREFIX = 'tt_forest_'
+
+# Run in a child interpreter by _compile_forest: compiles the pickled forest
+# (argv[1]) into single-row and batch extension modules (argv[2], argv[3])
+_FOREST_BUILD_SCRIPT = """
+import sys
+import joblib
+import sklearn_freezer
+model = joblib.load(sys.argv[1])
+sklearn_freezer.compile(model.predict_proba, 'c', module_name=sys.argv[2])
+sklearn_freezer.compile(model.predict_proba, 'c', module_name=sys.argv[3], batch_mode='numpy')
+"""
+try:
+    import lz4.frame  # noqa: F401 - lets joblib use LZ4
+    MODEL_COMPRESSION = ('lz4', 3)
+except ImportError:
+    MODEL_COMPRESSION = ('zlib', 1)
+
+# Batches longer than this are split across threads by predict_symptoms_batch
+BATCH_CHUNK_ROWS = 10000
+
+# Code given to categories never seen during training
+UNKNOWN_CATEGORY = -1
+
+# Histories at least this long scan ingredients with the Numba kernel
+NUMBA_SCAN_MIN_ROWS = 5000
+
+if njit is not None:
+    @njit(cache=True, parallel=True)
+    def scan_substrings(offsets, data, pat_offsets, pat_data, pat_group, out):
+        """Set out[row, group] to 1 when any of the group's byte patterns occurs in the row."""
+        for row in prange(len(offsets) - 1):
+            start, end = offsets[row], offsets[row + 1]
+            for p in range(len(pat_group)):
+                group = pat_group[p]
+                if out[row, group]:
+                    continue
+                p_start = pat_offsets[p]
+                p_len = pat_offsets[p + 1] - p_start
+                first = pat_data[p_start]
+                for i in range(start, end - p_len + 1):
+                    if data[i] != first:
+                        continue
+                    j = 1
+                    while j < p_len and data[i + j] == pat_data[p_start + j]:
+                        j += 1
+                    if j == p_len:
+                        out[row, group] = 1
+                        break
+
+def _file_digest(path):
+    """Return the SHA-256 hex digest of a file's contents."""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def _forest_module_name(digest, batch):
+    """Module name of the compiled Random Forest built for a bundle."""
+    return f"{FOREST_MODULE_PREFIX}{digest[:16]}{'_batch' if batch else ''}"
+
+def _byte_buffer(strings):
+    """Concatenate strings as UTF-8 bytes, returning (offsets, data) arrays."""
+    encoded = [s.encode() for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+def _substring_flags(values, groups):
+    """
+    Flag which groups of substrings occur in each of a column of lowercase strings.
+    
+    Args:
+        values: Series of lowercase strings
+        groups: List of '|'-separated substring alternatives, one per flag
+        
+    Returns:
+        ndarray: int8 matrix with one row per value and one column per group
+    """
+    if njit is None or len(values) < NUMBA_SCAN_MIN_ROWS:
+        return np.column_stack([
+            values.str.contains(group, regex=True).to_numpy(dtype=np.int8) for group in groups
+        ])
+    
+    patterns = [(g, p) for g, group in enumerate(groups) for p in group.split('|')]
+    pat_offsets, pat_data = _byte_buffer(p for _, p in patterns)
+    pat_group = np.array([g for g, _ in patterns], dtype=np.int64)
+    offsets, data = _byte_buffer(values)
+    
+    out = np.zeros((len(values), len(groups)), dtype=np.int8)
+    scan_substrings(offsets, data, pat_offsets, pat_data, pat_group, out)
+    return out
+
+def _quantize(col, value):
+    """Coarsen a feature value so near-identical meals share a prediction cache entry."""
+    if col == 'quantity':
+        return float(np.round(float(value), 1))
+    if col == 'days_since_epoch':
+        return int(value) // 7 * 7  # weekly bucket
+    return value
+
+def _quantize_column(col, values):
+    """Vectorized _quantize over a Series, so batch and single-meal scores agree."""
+    if col == 'quantity':
+        return values.astype(np.float64).round(1)
+    if col == 'days_since_epoch':
+        return values.astype(np.int64) // 7 * 7
+    return values
 
 class TummyTrackerML:
     """Machine learning engine for food intolerance prediction."""
     
+    # Recommendations for meals likely to cause symptoms, by food category
+    _RECO_TABLE = {
+        'dairy': "Consider dairy alternatives like almond milk or coconut yogurt.",
+        'gluten': "Try gluten-free alternatives like quinoa or rice.",
+        'spicy': "Consider milder versions or reduce spice levels."
+    }
+    _DEFAULT_RECO = "Monitor your symptoms and consider avoiding this food category temporarily."
+    _SAFE_RECO = "This food appears safe for you based on current data."
+    
     def __init__(self, model_path='data/models/'):
         self.model_path = model_path
         self.models = {}
-        self.label_encoders = {}
-        self.scaler = StandardScaler()
+        self.categories = {}  # categorical column -> list of categories, in code order
+        self.scaler = StandardScaler()  # only the Logistic Regression needs scaled features
         self.is_trained = False
+        self._rf_needs_scaling = False  # trees are invariant to feature scaling
+        self.rf_kwargs = dict(RF_PARAMS)  # override to tune the Random Forest
+        
+        # Inference lookups, derived from the fitted scaler and categories
+        self._feature_order = []
+        self._cat_lookup = {}
+        self._scale_mean = None
+        self._scale_scale = None
+        self._lr_w = None  # Logistic Regression weights, float32
+        self._lr_b = None  # Logistic Regression intercept
+        self._predict_cached = functools.lru_cache(maxsize=PREDICTION_CACHE_SIZE)(self._score_features)
+        self._rf_fast = None  # compiled predict_proba for one row, returns P(symptoms)
+        self._rf_fast_batch = None  # compiled predict_proba for a 2-D array of rows
         
         # Ensure model directory exists
         os.makedirs(model_path, exist_ok=True)
+    
+    def load_training_frame(self, db, user_id):
+        """
+        Load a user's meal history as columns with one joined query.
+        
+        Args:
+            db: Flask-SQLAlchemy database handle
+            user_id: ID of the user whose meals are loaded
+            
+        Returns:
+            meals_df: DataFrame of meal and food columns, ready for prepare_features
+            symptom_meal_ids: NumPy array of meal IDs that were followed by symptoms
+        """
+        from models import Food, Meal, Symptom
+        
+        query = db.session.query(
+            Meal.id, Food.category.label('food_category'), Food.ingredients, Food.allergens,
+            Meal.quantity, Meal.meal_time, Meal.notes
+        ).join(Food).filter(Meal.user_id == user_id)
+        meals_df = pd.read_sql(query.statement, db.session.connection(), parse_dates=['meal_time'])
+        
+        symptom_meal_ids = np.array(
+            db.session.query(Symptom.meal_id).filter(Symptom.user_id == user_id).all()
+        ).ravel()
+        
+        return meals_df, symptom_meal_ids
         
     def prepare_features(self, meals_data, symptoms_data):
         """
         Prepare features for machine learning from meals and symptoms data.
         
         Args:
-            meals_data: List of meal objects with food information
-            symptoms_data: List of symptom objects
+            meals_data: List of meal objects with food information, or the
+                DataFrame returned by load_training_frame
+            symptoms_data: List of symptom objects, or an array of symptom meal IDs
             
         Returns:
             X: Feature matrix
             y: Target variable (1 if symptoms occurred, 0 if not)
         """
-        if not meals_data:
+        if meals_data is None or len(meals_data) == 0:
             return None, None
-            
-        # Create a mapping of meal_id to symptoms
-        meal_symptoms = {}
-        for symptom in symptoms_data:
-            if symptom.meal_id not in meal_symptoms:
-                meal_symptoms[symptom.meal_id] = []
-            meal_symptoms[symptom.meal_id].append(symptom)
         
-        features = []
-        targets = []
-        
-        for meal in meals_data:
+        # Pull the raw meal columns out once, then derive every feature with
+        # vectorized pandas operations over whole columns
+        if isinstance(meals_data, pd.DataFrame):
+            df = meals_data
+        else:
+            df = pd.DataFrame({
+                'id': [meal.id for meal in meals_data],
+                'food_category': [meal.food.category for meal in meals_data],
+                'ingredients': [meal.food.ingredients for meal in meals_data],
+                'allergens': [meal.food.allergens for meal in meals_data],
+                'quantity': [meal.quantity for meal in meals_data],
+                'notes': [meal.notes for meal in meals_data],
+                'meal_time': [meal.meal_time for meal in meals_data]
+            })
+        
+        ingredients = df['ingredients'].fillna('').str.lower()
+        allergens = df['allergens'].fillna('').str.lower()
+        quantity = df['quantity'].fillna(0).astype('float32')
+        
+        # All substring tests for a column run as one pass
+        dairy, gluten, spicy = _substring_flags(
+            ingredients, [DAIRY_INGREDIENTS, GLUTEN_INGREDIENTS, SPICY_INGREDIENTS]
+        ).T
+        allergen_count = _substring_flags(allergens, TRACKED_ALLERGENS).sum(axis=1, dtype=np.int8)
+        
+        # Flags and small counts fit in int8, keeping the matrix compact
+        X = pd.DataFrame({
             # Basic meal features
-            meal_features = {
-                'food_category': meal.food.category,
-                'meal_hour': meal.meal_time.hour,
-                'meal_day_of_week': meal.meal_time.weekday(),
-                'has_quantity': 1 if meal.quantity else 0,
-                'quantity': meal.quantity if meal.quantity else 0,
-                'has_notes': 1 if meal.notes else 0
-            }
+            'food_category': df['food_category'],
+            'meal_hour': df['meal_time'].dt.hour.astype('int8'),
+            'meal_day_of_week': df['meal_time'].dt.weekday.astype('int8'),
+            'has_quantity': (quantity != 0).astype('int8'),
+            'quantity': quantity,
+            'has_notes': (df['notes'].fillna('') != '').astype('int8'),
             
-            # Food-specific features
-            if meal.food.ingredients:
-                meal_features['has_ingredients'] = 1
-                # Count common problematic ingredients
-                ingredients_lower = meal.food.ingredients.lower()
-                meal_features['has_dairy'] = 1 if any(word in ingredients_lower for word in ['milk', 'cheese', 'yogurt', 'butter', 'cream']) else 0
-                meal_features['has_gluten'] = 1 if any(word in ingredients_lower for word in ['wheat', 'flour', 'bread', 'pasta']) else 0
-                meal_features['has_spicy'] = 1 if any(word in ingredients_lower for word in ['pepper', 'chili', 'hot', 'spicy']) else 0
-            else:
-                meal_features['has_ingredients'] = 0
-                meal_features['has_dairy'] = 0
-                meal_features['has_gluten'] = 0
-                meal_features['has_spicy'] = 0
+            # Food-specific features: common problematic ingredients
+            'has_ingredients': (ingredients != '').astype('int8'),
+            'has_dairy': dairy,
+            'has_gluten': gluten,
+            'has_spicy': spicy,
             
-            # Allergen features
-            if meal.food.allergens:
-                meal_features['has_allergens'] = 1
-                allergens_lower = meal.food.allergens.lower()
-                meal_features['allergen_count'] = len([a for a in ['dairy', 'nuts', 'gluten', 'soy', 'fish'] if a in allergens_lower])
-            else:
-                meal_features['has_allergens'] = 0
-                meal_features['allergen_count'] = 0
+            # Allergen features: how many of the tracked allergens are listed
+            'has_allergens': (allergens != '').astype('int8'),
+            'allergen_count': allergen_count,
             
             # Temporal features
-            meal_features['days_since_epoch'] = (meal.meal_time - datetime(1970, 1, 1)).days
-            
-            # Target: Did this meal cause symptoms?
-            meal_features['caused_symptoms'] = 1 if meal.id in meal_symptoms else 0
-            
-            features.append(meal_features)
-            targets.append(meal_features['caused_symptoms'])
+            'days_since_epoch': df['meal_time'].to_numpy(dtype='datetime64[D]').view('int64').astype('int32')
+        })
         
-        # Convert to DataFrame
-        df = pd.DataFrame(features)
+        # Target: Did this meal cause symptoms?
+        if isinstance(symptoms_data, np.ndarray):
+            symptom_meal_ids = symptoms_data
+        else:
+            symptom_meal_ids = {symptom.meal_id for symptom in symptoms_data}
+        y = df['id'].isin(symptom_meal_ids).astype(int).rename('caused_symptoms')
         
-        # Encode categorical variables
+        # Encode categorical variables (sorted categories, so codes match the old LabelEncoder)
         categorical_cols = ['food_category']
         for col in categorical_cols:
-            if col in df.columns:
-                le = LabelEncoder()
-                df[col] = le.fit_transform(df[col].astype(str))
-                self.label_encoders[col] = le
-        
-        # Remove target column from features
-        X = df.drop('caused_symptoms', axis=1)
-        y = df['caused_symptoms']
+            if col in X.columns:
+                cat = pd.Categorical(X[col].astype(str))
+                X[col] = cat.codes
+                self.categories[col] = cat.categories.tolist()
         
         return X, y
     
-    def train_models(self, X, y):
+    def train_models(self, X, y, rf_kwargs=None):
         """
         Train multiple machine learning models.
         
         Args:
             X: Feature matrix
             y: Target variable
+            rf_kwargs: Optional RandomForestClassifier parameters, defaults to self.rf_kwargs
         """
         if X is None or y is None or len(X) < 10:
             print("Not enough data to train models. Need at least 10 meals.")
@@ -127,14 +336,15 @@ class TummyTrackerML:
         # Split data
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
         
-        # Scale features
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        # Scale features (both models train on float32)
+        X_train_scaled = self.scaler.fit_transform(X_train).astype(np.float32, copy=False)
+        X_test_scaled = self.scaler.transform(X_test).astype(np.float32, copy=False)
         
-        # Train Random Forest
-        rf_model = RandomForestClassifier(n_estimators=100, random_state=42)
-        rf_model.fit(X_train_scaled, y_train)
-        rf_score = accuracy_score(y_test, rf_model.predict(X_test_scaled))
+        # Train Random Forest on the raw features
+        rf_model = RandomForestClassifier(**(rf_kwargs or self.rf_kwargs))
+        rf_model.fit(X_train.values.astype(np.float32), y_train)
+        rf_score = accuracy_score(y_test, rf_model.predict(X_test.values.astype(np.float32)))
+        self._rf_needs_scaling = False
         
         # Train Logistic Regression
         lr_model = LogisticRegression(random_state=42, max_iter=1000)
@@ -155,6 +365,7 @@ class TummyTrackerML:
         }
         
         self.is_trained = True
+        self._prepare_inference()
         
         print(f"Models trained successfully!")
         print(f"Random Forest Accuracy: {rf_score:.3f}")
@@ -182,20 +393,9 @@ class TummyTrackerML:
                 'recommendation': 'Need more data to make predictions'
             }
         
-        # Prepare features
-        df = pd.DataFrame([meal_features])
-        
-        # Encode categorical variables
-        for col, le in self.label_encoders.items():
-            if col in df.columns:
-                df[col] = le.transform(df[col].astype(str))
-        
-        # Scale features
-        X_scaled = self.scaler.transform(df)
-        
-        # Make predictions with both models
-        rf_pred = self.models['random_forest']['model'].predict_proba(X_scaled)[0]
-        lr_pred = self.models['logistic_regression']['model'].predict_proba(X_scaled)[0]
+        # Repeated meals hit the cache and skip both models
+        key = tuple(_quantize(col, meal_features[col]) for col in self._feature_order)
+        rf_pred, lr_pred = self._predict_cached(key)
         
         # Ensemble prediction (average of both models)
         ensemble_prob = (rf_pred + lr_pred) / 2
@@ -221,19 +421,196 @@ class TummyTrackerML:
             }
         }
     
+    def predict_symptoms_batch(self, feats_df):
+        """
+        Predict symptoms for many meals at once.
+        
+        Args:
+            feats_df: DataFrame with one column per meal feature (same keys as
+                predict_symptoms takes), one row per meal
+            
+        Returns:
+            DataFrame: Per-meal 'probability' of symptoms, 'likely' (1 or 0,
+            where predict_symptoms returns a text 'prediction') and
+            'confidence', indexed like feats_df; None if not trained
+        """
+        if not self.is_trained:
+            return None
+        if len(feats_df) == 0:
+            return pd.DataFrame({
+                'probability': np.empty(0),
+                'likely': np.empty(0, dtype=np.int8),
+                'confidence': np.empty(0)
+            }, index=feats_df.index)
+        
+        # Encode categoricals with the cached lookups and build one float32 matrix
+        columns = []
+        for col in self._feature_order:
+            values = _quantize_column(col, feats_df[col])
+            if col in self._cat_lookup:
+                values = values.astype(str).map(self._cat_lookup[col]).fillna(UNKNOWN_CATEGORY)
+            columns.append(values.to_numpy(dtype=np.float32))
+        X = np.column_stack(columns)
+        
+        # Long histories are scored in chunks on a thread pool; NumPy and
+        # scikit-learn release the GIL in their compiled loops
+        n_chunks = min(os.cpu_count() or 1, -(-len(X) // BATCH_CHUNK_ROWS))
+        if n_chunks > 1:
+            parts = Parallel(n_jobs=n_chunks, backend='threading')(
+                delayed(self._score_chunk)(chunk) for chunk in np.array_split(X, n_chunks)
+            )
+            ensemble = np.concatenate(parts)
+        else:
+            ensemble = self._score_chunk(X)
+        
+        return pd.DataFrame({
+            'probability': ensemble,
+            'likely': (ensemble > 0.5).astype(np.int8),
+            'confidence': np.maximum(ensemble, 1.0 - ensemble)
+        }, index=feats_df.index)
+    
+    def _score_chunk(self, X):
+        """
+        Score a block of feature rows with both models in one pass each.
+        
+        Args:
+            X: float32 matrix of unscaled features in _feature_order
+            
+        Returns:
+            ndarray: Ensemble probability of symptoms for each row
+        """
+        Xs = (X - self._scale_mean) / self._scale_scale
+        X_rf = Xs if self._rf_needs_scaling else X
+        
+        if self._rf_fast_batch is not None:
+            rf_p = self._rf_fast_batch(np.ascontiguousarray(X_rf, dtype=np.float64))
+        else:
+            rf_p = self.models['random_forest']['model'].predict_proba(X_rf)[:, 1]
+        lr_p = expit(Xs @ self._lr_w + self._lr_b)
+        
+        return 0.5 * (rf_p + lr_p)
+    
+    def _score_features(self, feature_values):
+        """
+        Score one feature row with both models (cached per instance by _predict_cached).
+        
+        Args:
+            feature_values: Tuple of raw feature values in _feature_order
+            
+        Returns:
+            tuple: Read-only class probability arrays from the Random Forest
+            and Logistic Regression models
+        """
+        # Fill one feature row directly, encoding categoricals via dict lookups
+        row = np.empty((1, len(self._feature_order)), dtype=np.float32)
+        for i, (col, value) in enumerate(zip(self._feature_order, feature_values)):
+            if col in self._cat_lookup:
+                value = self._cat_lookup[col].get(str(value), UNKNOWN_CATEGORY)
+            row[0, i] = value
+        
+        # Scale features for the Logistic Regression
+        X_scaled = (row - self._scale_mean) / self._scale_scale
+        X_rf = X_scaled if self._rf_needs_scaling else row
+        
+        # Make predictions with both models
+        if self._rf_fast is not None:
+            # The compiled function takes Python floats, not NumPy scalars
+            rf_prob = self._rf_fast(*X_rf[0].tolist())
+            rf_pred = np.array([1.0 - rf_prob, rf_prob])
+        else:
+            rf_pred = self.models['random_forest']['model'].predict_proba(X_rf)[0]
+        lr_prob = expit(X_scaled[0] @ self._lr_w + self._lr_b)
+        lr_pred = np.array([1.0 - lr_prob, lr_prob])
+        rf_pred.flags.writeable = False
+        lr_pred.flags.writeable = False
+        return rf_pred, lr_pred
+    
+    def _prepare_inference(self):
+        """Cache the feature order, category codes and scaling used by predict_symptoms."""
+        self._feature_order = list(self.scaler.feature_names_in_)
+        self._cat_lookup = {
+            col: {value: code for code, value in enumerate(values)}
+            for col, values in self.categories.items()
+        }
+        self._scale_mean = self.scaler.mean_.astype(np.float32)
+        self._scale_scale = self.scaler.scale_.astype(np.float32)
+        
+        # Logistic Regression scoring is sigmoid(X @ w + b), no sklearn call needed
+        lr_model = self.models['logistic_regression']['model']
+        self._lr_w = lr_model.coef_.astype(np.float32).ravel()
+        self._lr_b = float(lr_model.intercept_[0])
+        
+        # The compiled forest belongs to the previous models until save/load replaces it
+        self._rf_fast, self._rf_fast_batch = None, None
+        
+        # New models invalidate every cached prediction
+        self._predict_cached.cache_clear()
+    
+    def _compile_forest(self, digest):
+        """
+        Build the Random Forest's predict_proba as C extensions in model_path
+        with sklearn-freezer, named after the bundle digest so later loads of
+        the same bundle import them instead of compiling again.
+        
+        Args:
+            digest: SHA-256 hex digest of the saved bundle
+        """
+        # Drop extensions built for earlier bundles
+        prefix = _forest_module_name(digest, False)
+        for file_name in os.listdir(self.model_path):
+            if file_name.startswith(FOREST_MODULE_PREFIX) and not file_name.startswith(prefix):
+                os.remove(os.path.join(self.model_path, file_name))
+        
+        # setuptools writes its build tree to the working directory and prints
+        # to the process streams, so the build runs in a child process
+        build_dir = tempfile.mkdtemp()
+        try:
+            forest_path = os.path.join(build_dir, 'forest.joblib')
+            joblib.dump(self.models['random_forest']['model'], forest_path)
+            result = subprocess.run(
+                [sys.executable, '-c', _FOREST_BUILD_SCRIPT, forest_path,
+                 _forest_module_name(digest, False), _forest_module_name(digest, True)],
+                cwd=build_dir, capture_output=True, text=True
+            )
+            if result.returncode != 0:
+                lines = result.stderr.strip().splitlines()
+                raise RuntimeError(lines[-1] if lines else f'build exited with status {result.returncode}')
+            
+            for file_name in os.listdir(build_dir):
+                if file_name.startswith(FOREST_MODULE_PREFIX) and file_name.endswith(tuple(importlib.machinery.EXTENSION_SUFFIXES)):
+                    shutil.move(os.path.join(build_dir, file_name), os.path.join(self.model_path, file_name))
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+    
+    def _import_forest(self, digest):
+        """
+        Import the compiled Random Forest built for a bundle.
+        
+        Args:
+            digest: SHA-256 hex digest of the saved bundle
+            
+        Returns:
+            tuple: (single-row, batch) compiled predictors, or (None, None) to
+            fall back to scikit-learn
+        """
+        predictors = []
+        for batch in (False, True):
+            spec = importlib.machinery.PathFinder.find_spec(_forest_module_name(digest, batch), [self.model_path])
+            if spec is None:
+                return None, None
+            module = importlib.util.module_from_spec(spec)
+            try:
+                spec.loader.exec_module(module)
+            except ImportError:  # built for another platform or NumPy
+                return None, None
+            predictors.append(module.f)
+        return tuple(predictors)
+    
     def _generate_recommendation(self, meal_features, prediction, confidence):
         """Generate personalized recommendations based on prediction."""
         if prediction == 1:  # Likely to cause symptoms
-            if meal_features.get('food_category') == 'dairy':
-                return "Consider dairy alternatives like almond milk or coconut yogurt."
-            elif meal_features.get('food_category') == 'gluten':
-                return "Try gluten-free alternatives like quinoa or rice."
-            elif meal_features.get('food_category') == 'spicy':
-                return "Consider milder versions or reduce spice levels."
-            else:
-                return "Monitor your symptoms and consider avoiding this food category temporarily."
-        else:  # Unlikely to cause symptoms
-            return "This food appears safe for you based on current data."
+            return self._RECO_TABLE.get(meal_features.get('food_category'), self._DEFAULT_RECO)
+        return self._SAFE_RECO  # Unlikely to cause symptoms
     
     def get_feature_importance(self):
         """Get feature importance from the Random Forest model."""
@@ -241,12 +618,8 @@ class TummyTrackerML:
             return None
         
         rf_model = self.models['random_forest']['model']
-        feature_names = ['food_category', 'meal_hour', 'meal_day_of_week', 'has_quantity', 
-                        'quantity', 'has_notes', 'has_ingredients', 'has_dairy', 'has_gluten', 
-                        'has_spicy', 'has_allergens', 'allergen_count', 'days_since_epoch']
-        
         importance = rf_model.feature_importances_
-        feature_importance = list(zip(feature_names, importance))
+        feature_importance = list(zip(self._feature_order, importance))
         feature_importance.sort(key=lambda x: x[1], reverse=True)
         
         return feature_importance
@@ -256,48 +629,122 @@ class TummyTrackerML:
         if not self.is_trained:
             return
         
-        for name, model_info in self.models.items():
-            model_path = os.path.join(self.model_path, f'{name}.pkl')
-            joblib.dump(model_info['model'], model_path)
+        # One compressed bundle, so loading is a single file read
+        bundle = {
+            'models': self.models,
+            'scaler': self.scaler,
+            'categories': self.categories,
+            'rf_needs_scaling': self._rf_needs_scaling
+        }
         
-        # Save scaler and encoders
-        joblib.dump(self.scaler, os.path.join(self.model_path, 'scaler.pkl'))
-        joblib.dump(self.label_encoders, os.path.join(self.model_path, 'encoders.pkl'))
+        # Write beside the old bundle and swap it in, so a crash never leaves a partial file
+        bundle_path = os.path.join(self.model_path, MODEL_BUNDLE)
+        tmp_path = bundle_path + '.tmp'
+        joblib.dump(bundle, tmp_path, compress=MODEL_COMPRESSION, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, bundle_path)
+        
+        # Compile the forest once per bundle; loads of this bundle reuse the extensions
+        digest = _file_digest(bundle_path)
+        if sklearn_freezer is not None:
+            try:
+                self._compile_forest(digest)
+            except Exception as e:
+                print(f"Could not compile Random Forest, using scikit-learn: {e}")
+        self._rf_fast, self._rf_fast_batch = self._import_forest(digest)
         
         print("Models saved successfully!")
     
     def load_models(self):
         """Load trained models from disk."""
         try:
-            for name in ['random_forest', 'logistic_regression']:
-                model_path = os.path.join(self.model_path, f'{name}.pkl')
-                if os.path.exists(model_path):
-                    model = joblib.load(model_path)
-                    self.models[name] = {
-                        'model': model,
-                        'type': name.replace('_', ' ').title()
-                    }
-            
-            # Load scaler and encoders
-            scaler_path = os.path.join(self.model_path, 'scaler.pkl')
-            encoders_path = os.path.join(self.model_path, 'encoders.pkl')
+            bundle_path = os.path.join(self.model_path, MODEL_BUNDLE)
+            digest = None
+            if os.path.exists(bundle_path):
+                digest = _file_digest(bundle_path)
+                bundle = joblib.load(bundle_path)
+                self.models = bundle['models']
+                self.scaler = bundle['scaler']
+                self.categories = bundle['categories']
+                self._rf_needs_scaling = bundle['rf_needs_scaling']
+            elif not self._load_model_files():
+                return False
             
-            if os.path.exists(scaler_path) and os.path.exists(encoders_path):
-                self.scaler = joblib.load(scaler_path)
-                self.label_encoders = joblib.load(encoders_path)
-                self.is_trained = True
-                print("Models loaded successfully!")
-                return True
+            self.is_trained = True
+            self._prepare_inference()
+            if digest is not None:
+                self._rf_fast, self._rf_fast_batch = self._import_forest(digest)
+            print("Models loaded successfully!")
+            return True
             
         except Exception as e:
             print(f"Error loading models: {e}")
         
         return False
     
+    def _load_model_files(self):
+        """Load models saved as separate pickles by earlier versions."""
+        for name in ['random_forest', 'logistic_regression']:
+            model_path = os.path.join(self.model_path, f'{name}.pkl')
+            if os.path.exists(model_path):
+                model = joblib.load(model_path)
+                self.models[name] = {
+                    'model': model,
+                    'type': name.replace('_', ' ').title()
+                }
+        
+        # Load scaler and encoders
+        scaler_path = os.path.join(self.model_path, 'scaler.pkl')
+        encoders_path = os.path.join(self.model_path, 'encoders.pkl')
+        
+        if not (os.path.exists(scaler_path) and os.path.exists(encoders_path)):
+            return False
+        
+        self.scaler = joblib.load(scaler_path)
+        self.categories = {col: le.classes_.tolist() for col, le in joblib.load(encoders_path).items()}
+        
+        # Separately pickled forests were always trained on scaled features
+        self._rf_needs_scaling = True
+        return True
+    
+    def reload(self):
+        """
+        Load the models saved under this instance's model path into a fresh
+        engine and make it the shared one returned by get_ml().
+        
+        Train on a separate instance, then call reload() so requests keep
+        using the old models until the new ones are fully loaded.
+        
+        Returns:
+            TummyTrackerML: The newly shared engine, or None if loading failed
+        """
+        global _ML
+        fresh = TummyTrackerML(self.model_path)
+        if not fresh.load_models():
+            return None
+        _ML = fresh  # a single reference swap, so readers see old or new, never partial
+        return fresh
+    
     def get_model_status(self):
         """Get current status of the ML system."""
         return {
             'is_trained': self.is_trained,
             'models_available': list(self.models.keys()),
-            'total_models': len(self.models)
+            'total_models': len(self.models),
+            'prediction_cache': self._predict_cached.cache_info()._asdict()
         }
+
+
+# Shared engine, loaded once per process
+_ML = None
+_ML_LOCK = threading.Lock()
+
+def get_ml():
+    """Return the process-wide TummyTrackerML, loading saved models on first use."""
+    global _ML
+    if _ML is None:
+        with _ML_LOCK:
+            if _ML is None:
+                ml = TummyTrackerML()
+                ml.load_models()
+                _ML = ml
+    return _ML
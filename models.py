@@ -1,10 +1,16 @@
 from datetime import datetime
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, event
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
 db = SQLAlchemy()
 
+def password_hash_method():
+    """Return the werkzeug hashing method configured for the current app."""
+    return current_app.config.get('PASSWORD_HASH_METHOD', 'pbkdf2')
+
 class User(UserMixin, db.Model):
     """User model for authentication and user management."""
     __tablename__ = 'users'
@@ -21,7 +27,7 @@ class User(UserMixin, db.Model):
     
     def set_password(self, password):
         """Hash and set the user's password."""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, method=password_hash_method())
     
     def check_password(self, password):
         """Check if the provided password matches the hash."""
@@ -36,12 +42,19 @@ class Food(db.Model):
     __tablename__ = 'foods'
     
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(200), nullable=False)
+    name = db.Column(db.String(200), nullable=False, index=True)
     category = db.Column(db.String(100))  # spicy, dairy, gluten, etc.
     ingredients = db.Column(db.Text)  # JSON string of ingredients
     allergens = db.Column(db.Text)  # JSON string of allergens
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Full-text index for name search on PostgreSQL (SQLite uses food_fts below)
+    __table_args__ = (
+        db.Index(
+            'ix_foods_name_tsv', db.text("to_tsvector('simple', name)"), postgresql_using='gin'
+        ).ddl_if(dialect='postgresql'),
+    )
+    
     # Relationships
     meals = db.relationship('Meal', backref='food', lazy=True)
     
@@ -49,18 +62,39 @@ class Food(db.Model):
         return f'<Food {self.name}>'
 
 
+# SQLite FTS5 index over food names, kept in sync with the foods table by triggers
+FOOD_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS food_fts USING fts5(name, content='foods', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS foods_fts_insert AFTER INSERT ON foods BEGIN "
+    "INSERT INTO food_fts(rowid, name) VALUES (new.id, new.name); END",
+    "CREATE TRIGGER IF NOT EXISTS foods_fts_delete AFTER DELETE ON foods BEGIN "
+    "INSERT INTO food_fts(food_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+    "CREATE TRIGGER IF NOT EXISTS foods_fts_update AFTER UPDATE OF name ON foods BEGIN "
+    "INSERT INTO food_fts(food_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+    "INSERT INTO food_fts(rowid, name) VALUES (new.id, new.name); END",
+)
+
+for _statement in FOOD_FTS_DDL:
+    event.listen(Food.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+
+
 class Meal(db.Model):
     """Meal model for tracking food consumption."""
     __tablename__ = 'meals'
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    food_id = db.Column(db.Integer, db.ForeignKey('foods.id'), nullable=False)
+    food_id = db.Column(db.Integer, db.ForeignKey('foods.id'), nullable=False, index=True)
     quantity = db.Column(db.Float)  # Amount consumed
     meal_time = db.Column(db.DateTime, nullable=False)  # When the meal was eaten
     notes = db.Column(db.Text)  # Additional notes about the meal
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Per-user listings always filter on user_id and sort newest first
+    __table_args__ = (
+        db.Index('ix_meal_user_time', user_id, meal_time.desc()),
+    )
+    
     # Relationships
     symptoms = db.relationship('Symptom', backref='meal', lazy=True)
     
@@ -74,7 +108,7 @@ class Symptom(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    meal_id = db.Column(db.Integer, db.ForeignKey('meals.id'), nullable=False)
+    meal_id = db.Column(db.Integer, db.ForeignKey('meals.id'), nullable=False, index=True)
     symptom_type = db.Column(db.String(100), nullable=False)  # nausea, bloating, etc.
     severity = db.Column(db.Integer, nullable=False)  # 1-5 scale
     onset_time = db.Column(db.DateTime, nullable=False)  # When symptoms started
@@ -82,6 +116,11 @@ class Symptom(db.Model):
     notes = db.Column(db.Text)  # Additional symptom notes
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Per-user listings always filter on user_id and sort newest first
+    __table_args__ = (
+        db.Index('ix_symptom_user_onset', user_id, onset_time.desc()),
+    )
+    
     def __repr__(self):
         return f'<Symptom {self.symptom_type} (severity: {self.severity})>'
 
@@ -6,6 +6,9 @@ Simple test script to verify Tummy Tracker application setup.
 import os
 import sys
 
+# Route tests create their own rows, so keep them out of any real database
+os.environ['DATABASE_URL'] = 'sqlite://'
+
 def test_imports():
     """Test if all required modules can be imported."""
     print("Testing imports...")
@@ -102,6 +105,177 @@ def test_forms():
         print(f"✗ Forms import failed: {e}")
         return False
 
+def test_login_redirect():
+    """Test that login only follows same-site next URLs."""
+    print("\nTesting login redirect targets...")
+    
+    from app import app, safe_next_url
+    with app.test_request_context():
+        index = safe_next_url(None)
+        for target in ['//evil.com', '/\\evil.com', 'https://x', '/\tevil', '/\\tevil', '']:
+            assert safe_next_url(target) == index, f"next={target!r} should fall back to the index"
+        assert safe_next_url('/meals') == '/meals', "next='/meals' should be followed"
+    print("✓ Off-site next URLs fall back to the index")
+    return True
+
+def test_analytics_category_counts():
+    """Test that a meal with several symptoms is counted once on the analytics page."""
+    print("\nTesting analytics category counts...")
+    
+    from datetime import datetime, timedelta
+    from flask import template_rendered
+    from app import app, db
+    from models import User, Food, Meal, Symptom
+    
+    with app.app_context():
+        db.create_all()
+        try:
+            user = User(username='analyst', email='analyst@example.com', password_hash='unused')
+            food = Food(name='Milkshake', category='dairy')
+            db.session.add_all([user, food])
+            db.session.commit()
+            meal = Meal(user_id=user.id, food_id=food.id, meal_time=datetime(2024, 1, 1, 8))
+            db.session.add(meal)
+            db.session.commit()
+            db.session.add_all([
+                Symptom(user_id=user.id, meal_id=meal.id, symptom_type=symptom_type, severity=severity,
+                        onset_time=meal.meal_time + timedelta(hours=1))
+                for symptom_type, severity in [('bloating', 2), ('nausea', 4)]
+            ])
+            db.session.commit()
+            
+            rendered = []
+            def record(sender, template, context, **extra):
+                rendered.append(context)
+            
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session['_user_id'] = str(user.id)
+            with template_rendered.connected_to(record, app):
+                response = client.get('/analytics')
+            
+            assert response.status_code == 200, f"/analytics returned {response.status_code}"
+            stats = [(stat.category, stat.meal_count, stat.avg_severity) for stat in rendered[-1]['category_stats']]
+            assert stats == [('dairy', 1, 3.0)], stats
+        finally:
+            db.session.remove()
+            db.drop_all()
+    print("✓ Meals with several symptoms are counted once per category")
+    return True
+
+def test_food_search_queries():
+    """Test that food search input is quoted for SQLite FTS5 and PostgreSQL."""
+    print("\nTesting food search queries...")
+    
+    import sqlite3
+    from app import fts5_prefix_query, tsquery_prefix_query
+    
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE VIRTUAL TABLE food_fts USING fts5(name)')
+    conn.executemany('INSERT INTO food_fts (name) VALUES (?)',
+                     [('Chicken Curry',), ('Greek Yogurt',), ('Mac "n" Cheese',), ('Fish OR Chips',)])
+    
+    def search(term):
+        rows = conn.execute('SELECT name FROM food_fts WHERE food_fts MATCH ? ORDER BY name',
+                            (fts5_prefix_query(term),))
+        return [name for name, in rows]
+    
+    assert search('chick') == ['Chicken Curry'], "FTS5 search should match word prefixes"
+    assert search('greek yog') == ['Greek Yogurt'], "FTS5 search should require every word"
+    for term in ['"', 'OR', 'NEAR(', '*', 'name:', 'curry AND', '"n"']:
+        search(term)  # raises sqlite3.OperationalError if syntax leaks through
+    assert search('OR') == ['Fish OR Chips'], "FTS5 operators should be searched as plain words"
+    print("✓ FTS5 queries match prefixes and quote user input")
+    
+    assert tsquery_prefix_query("chick o'brien a\\b") == "'chick':* & 'o''brien':* & 'a\\\\b':*"
+    print("✓ PostgreSQL tsqueries match prefixes and quote user input")
+    return True
+
+def test_ingredient_scan_paths():
+    """Test that the Numba ingredient scan flags the same rows as pandas str.contains."""
+    print("\nTesting ingredient scan paths...")
+    
+    import pandas as pd
+    import ml_engine
+    
+    if ml_engine.njit is None:
+        print("- Numba not installed, skipping")
+        return True
+    
+    values = pd.Series(['', 'milk', 'whole wheat bread', 'crème fraîche, chili', 'hot sauce',
+                        'soy, fish', 'peppercorn', 'buttermilk pancakes', 'nuts', 'rice'])
+    groups = [ml_engine.DAIRY_INGREDIENTS, ml_engine.GLUTEN_INGREDIENTS, ml_engine.SPICY_INGREDIENTS]
+    groups += ml_engine.TRACKED_ALLERGENS
+    
+    threshold = ml_engine.NUMBA_SCAN_MIN_ROWS
+    try:
+        ml_engine.NUMBA_SCAN_MIN_ROWS = len(values) + 1
+        expected = ml_engine._substring_flags(values, groups)
+        ml_engine.NUMBA_SCAN_MIN_ROWS = 0
+        flags = ml_engine._substring_flags(values, groups)
+    finally:
+        ml_engine.NUMBA_SCAN_MIN_ROWS = threshold
+    
+    assert flags.dtype == expected.dtype and (flags == expected).all(), (flags, expected)
+    print("✓ Numba and pandas ingredient scans agree")
+    return True
+
+def test_ml_model_files():
+    """Test that models saved as separate pickles by the original engine still load."""
+    print("\nTesting ML model file loading...")
+    
+    import io
+    import tempfile
+    from contextlib import redirect_stdout
+    from datetime import datetime, timedelta
+    from types import SimpleNamespace
+    import joblib
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+    import ml_engine
+    
+    categories = ['dairy', 'gluten', 'spicy']
+    start = datetime(2024, 1, 1, 8)
+    foods = [SimpleNamespace(category=c, ingredients=f'{c} mix', allergens=c) for c in categories]
+    meals = [SimpleNamespace(id=i, food=foods[i % 3], quantity=1.0 + i % 4, notes=None,
+                             meal_time=start + timedelta(hours=5 * i)) for i in range(60)]
+    symptoms = [SimpleNamespace(meal_id=meal.id) for meal in meals if meal.food.category == 'dairy']
+    X, y = ml_engine.TummyTrackerML(tempfile.gettempdir()).prepare_features(meals, symptoms)
+    
+    # The original engine fit both models on scaled features and kept LabelEncoders
+    scaler = StandardScaler().fit(X)
+    X_scaled = scaler.transform(X)
+    rf = RandomForestClassifier(n_estimators=10, random_state=42).fit(X_scaled, y)
+    lr = LogisticRegression(random_state=42).fit(X_scaled, y)
+    encoder = LabelEncoder().fit(categories)
+    
+    features = dict(food_category='dairy', meal_hour=8, meal_day_of_week=0, has_quantity=1, quantity=2.0,
+                    has_notes=0, has_ingredients=1, has_dairy=0, has_gluten=0, has_spicy=0,
+                    has_allergens=1, allergen_count=1, days_since_epoch=19719)
+    row = pd.DataFrame([features])[X.columns]
+    row['food_category'] = encoder.transform(row['food_category'])
+    row_scaled = scaler.transform(row)
+    prob = (rf.predict_proba(row_scaled)[0, 1] + lr.predict_proba(row_scaled)[0, 1]) / 2
+    
+    with tempfile.TemporaryDirectory() as model_path:
+        joblib.dump(rf, f'{model_path}/random_forest.pkl')
+        joblib.dump(lr, f'{model_path}/logistic_regression.pkl')
+        joblib.dump(scaler, f'{model_path}/scaler.pkl')
+        joblib.dump({'food_category': encoder}, f'{model_path}/encoders.pkl')
+        
+        ml = ml_engine.TummyTrackerML(model_path)
+        with redirect_stdout(io.StringIO()):
+            assert ml.load_models(), "separate model pickles should load"
+    
+    assert ml.categories == {'food_category': categories}, "LabelEncoder classes should become the category list"
+    assert ml._rf_needs_scaling, "the original forest was trained on scaled features"
+    result = ml.predict_symptoms(features)
+    assert abs(result['confidence'] - max(prob, 1 - prob)) < 1e-5, (result['confidence'], prob)
+    print("✓ Model files loaded with matching predictions")
+    return True
+
 def main():
     """Run all tests."""
     print("=" * 50)
@@ -113,14 +287,24 @@ def main():
         test_app_creation,
         test_database_models,
         test_ml_engine,
-        test_forms
+        test_forms,
+        test_login_redirect,
+        test_analytics_category_counts,
+        test_food_search_queries,
+        test_ingredient_scan_paths,
+        test_ml_model_files
     ]
     
     passed = 0
     total = len(tests)
     
     for test in tests:
-        if test():
+        try:
+            ok = test()
+        except AssertionError as e:
+            print(f"✗ {e}")
+            ok = False
+        if ok:
             passed += 1
     
     print("\n" + "=" * 50)